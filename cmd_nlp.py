@@ -7,20 +7,278 @@ Cross-platform command generation
 
 import re
 import json
+import mmap
+import atexit
+import functools
+import operator
+import importlib.util
 import os
-import subprocess
 import sys
-import platform
-from datetime import datetime, timezone
-from typing import Optional, Tuple, List, Dict, Callable, Any, Union
+import time
+from collections import Counter, OrderedDict
+from typing import (TYPE_CHECKING, Optional, Tuple, List, Dict, Callable, Any, Union,
+                    Iterator, Iterable)
 
-# Try to import prompt_toolkit for interactive history support
+if TYPE_CHECKING:
+    import argparse  # Imported lazily in _build_parser at runtime
+
+# Check for prompt_toolkit (interactive history support) without importing it; it pulls
+# in asyncio and dozens of modules, so only interactive mode loads it
+PROMPT_TOOLKIT_AVAILABLE = importlib.util.find_spec("prompt_toolkit") is not None
+
+# Try to import orjson for faster encoding/decoding of the JSONL command log
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Without orjson, ujson is still a C decoder several times faster than json
+try:
+    import ujson
+    UJSON_AVAILABLE = True
+except ImportError:
+    UJSON_AVAILABLE = False
+
+# All three accept bytes and raise ValueError subclasses, so callers catch ValueError
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+elif UJSON_AVAILABLE:
+    _json_loads = ujson.loads
+else:
+    _json_loads = json.loads
+
+
+def _json_dumps_line(obj: Dict[str, Any]) -> bytes:
+    """Serialize a log entry as one UTF-8 encoded JSONL line"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            pass  # e.g. a lone surrogate from an undecodable argv byte; json escapes it
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+
+# Try to import RE2 for linear-time matching of the combined dispatch regex
 try:
-    from prompt_toolkit import PromptSession
-    from prompt_toolkit.history import FileHistory
-    PROMPT_TOOLKIT_AVAILABLE = True
+    import re2
+    RE2_AVAILABLE = True
 except ImportError:
-    PROMPT_TOOLKIT_AVAILABLE = False
+    RE2_AVAILABLE = False
+
+# Buffered log entries are flushed after this many writes or seconds, whichever comes first
+_LOG_BUFFER_SIZE = 64 * 1024
+_LOG_FLUSH_ENTRIES = 32
+_LOG_FLUSH_SECONDS = 1.0
+
+# show_stats saves its tallies next to the log and later resumes reading from where it
+# stopped; the bytes just before that offset are kept to spot a rotated or rewritten log
+_STATS_SNAPSHOT_SUFFIX = ".stats.json"
+_STATS_SNAPSHOT_TAIL = 64
+
+
+def _empty_tallies() -> Dict[str, Any]:
+    """Tallies for a log with no entries read yet"""
+    return {"offset": 0, "total": 0, "executed": 0, "safe": 0,
+            "categories": Counter(), "patterns": Counter(), "shells": Counter()}
+
+# Most recent parse() results kept per parser, keyed on (shell, stripped input)
+_PARSE_CACHE_MAX = 512
+
+# Inputs at least this long are dispatched with RE2 (when installed) instead of re
+_RE2_MIN_LENGTH = 1000
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a regex once per process; re's own cache is small and flushed wholesale"""
+    return re.compile(pattern, flags)
+
+
+# Leading literal word of a pattern alternative, e.g. "go" in "go to (.+)"; the end of the
+# source also ends the word since patterns must match the whole input
+_FIRST_WORD_RE = re.compile(r"([a-z0-9_-]+)(?: (?![?*{])|\$|\\Z|$)", re.IGNORECASE)
+
+
+def _split_alternatives(source: str) -> List[str]:
+    """Split a regex source on its top-level '|' (ignoring groups, classes and escapes)"""
+    parts = []
+    depth = 0
+    in_class = False
+    current = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            current.append(source[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def _first_tokens(source: str) -> Optional[frozenset]:
+    """
+    Get the lowercased first words any input matching this pattern must start with
+
+    Returns:
+        frozenset of words, or None if the first word cannot be determined
+        statically (the pattern is then tried for every input)
+    """
+    tokens = set()
+    for alternative in _split_alternatives(source):
+        for anchor in ("^", "\\A"):
+            if alternative.startswith(anchor):
+                alternative = alternative[len(anchor):]
+        if alternative.startswith("(?:"):
+            # Leading verb group, e.g. "(?:edit|open) file": distribute the rest over it
+            end = _group_end(alternative)
+            if end is None or alternative[end + 1:end + 2] in ("?", "*", "+", "{"):
+                return None
+            rest = alternative[end + 1:]
+            for option in _split_alternatives(alternative[3:end]):
+                option_tokens = _first_tokens(option + rest)
+                if option_tokens is None:
+                    return None
+                tokens |= option_tokens
+            continue
+        match = _FIRST_WORD_RE.match(alternative)
+        if not match:
+            return None
+        tokens.add(match.group(1).lower())
+    return frozenset(tokens)
+
+
+def _group_end(source: str) -> Optional[int]:
+    """Get the index of the ')' closing the group that opens at source[0]"""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return None
+
+
+# Characters that make a pattern more than a plain literal string
+_REGEX_META_RE = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def _literal_alternatives(source: str) -> Optional[List[str]]:
+    """Get the lowercased strings a pattern matches exactly, or None if it is not literal"""
+    literals = []
+    for alternative in _split_alternatives(source):
+        if alternative.startswith("^"):
+            alternative = alternative[1:]
+        if alternative.endswith("$"):
+            alternative = alternative[:-1]
+        for expansion in _expand_optional_literals(alternative):
+            if not expansion or _REGEX_META_RE.search(expansion):
+                return None
+            literals.append(expansion.lower())
+    return literals
+
+
+# An optional literal group such as "(?:running )?"
+_OPTIONAL_LITERAL_RE = re.compile(r"\(\?:([^.^$*+?{}\[\]\\|()]*)\)\?")
+
+# Patterns with more optional groups than this are left to the regex engine
+_MAX_OPTIONAL_LITERALS = 4
+
+
+def _expand_optional_literals(alternative: str) -> List[str]:
+    """Expand optional literal groups into every string they allow, e.g. "a(?:b)?" -> a, ab"""
+    parts = _OPTIONAL_LITERAL_RE.split(alternative)
+    if len(parts) == 1 or (len(parts) - 1) // 2 > _MAX_OPTIONAL_LITERALS:
+        return [alternative]
+    expansions = [""]
+    for i, part in enumerate(parts):
+        if i % 2:
+            expansions = [e + choice for e in expansions for choice in ("", part)]
+        else:
+            expansions = [e + part for e in expansions]
+    return expansions
+
+
+# "{1}", "{2}", ... in a custom pattern's command template
+_PLACEHOLDER_RE = re.compile(r"\{([1-9][0-9]*)\}")
+
+
+def _compile_template(template: str) -> Callable[[re.Match], str]:
+    """
+    Build a generator that fills a custom command template from a match
+
+    The template is split into literal text and group numbers once, at load time,
+    so each call only joins the pieces. Placeholders past the last matched group
+    are left as written.
+    """
+    parts = _PLACEHOLDER_RE.split(template)
+    if len(parts) == 1:
+        return lambda match: template
+
+    head = parts[0]
+    pieces = tuple((int(group), f"{{{group}}}", literal)
+                   for group, literal in zip(parts[1::2], parts[2::2]))
+
+    def generate(match: re.Match) -> str:
+        last = match.lastindex or 0
+        out = [head]
+        for group, placeholder, literal in pieces:
+            # An unmatched group is None, so join raises and get_command declines the match
+            out.append(match.group(group) if group <= last else placeholder)
+            out.append(literal)
+        return "".join(out)
+
+    return generate
+
+
+# Custom pattern fields handed to re.compile or _compile_template, or used as index and
+# stats keys, so they must be strings
+_CUSTOM_PATTERN_STRING_FIELDS = ("pattern", "command", "cmd_command", "ps_command",
+                                 "description", "category")
+
+
+def _custom_pattern_error(entry: Any) -> Optional[str]:
+    """Describe why a custom pattern entry cannot be loaded, or None if its shape is valid"""
+    if not isinstance(entry, dict):
+        return "entry is not an object"
+    for field in _CUSTOM_PATTERN_STRING_FIELDS:
+        value = entry.get(field)
+        if value is not None and not isinstance(value, str):
+            return f"'{field}' must be a string"
+    return None
+
+
+# Numbered or named backreferences, and numbered conditionals like (?(1)...), cannot
+# survive being merged into one regex
+_BACKREFERENCE_RE = re.compile(r"\\\d|\(\?P=|\(\?\(\d")
 
 
 class ShellType:
@@ -33,9 +291,14 @@ class ShellType:
 class CommandPattern:
     """Represents a single command pattern with regex and generators for each shell"""
 
+    # No per-instance __dict__: smaller objects and faster attribute reads in parse
+    __slots__ = ("pattern", "description", "safe", "category", "generators", "first_tokens")
+
     def __init__(self, pattern: str, generators: Union[Callable, Dict[str, Callable]], 
                  description: str, safe: bool = True, category: str = "general"):
-        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.pattern = _compile(pattern, re.IGNORECASE)
+        # Words an input must start with to match, used to bucket patterns for dispatch
+        self.first_tokens = _first_tokens(pattern)
         self.description = description
         self.safe = safe  # False if command is destructive
         self.category = category
@@ -51,7 +314,8 @@ class CommandPattern:
             self.generators = generators
 
     def match(self, text: str) -> Optional[re.Match]:
-        return self.pattern.match(text)
+        """Match the whole input, not just a prefix of it"""
+        return self.pattern.fullmatch(text)
     
     def get_command(self, shell: str, match: re.Match) -> Optional[str]:
         """Get command for specific shell type"""
@@ -65,30 +329,98 @@ class CommandPattern:
         return None
 
 
+# Listing commands for "list files sorted by <key>", built once rather than per call
+_SORTED_LIST_CMD = {
+    "size": "dir /O-S",
+    "name": "dir /O-N",
+    "date": "dir /O-D"
+}
+_SORTED_LIST_PS = {
+    "size": "Get-ChildItem | Sort-Object Length -Descending",
+    "name": "Get-ChildItem | Sort-Object Name",
+    "date": "Get-ChildItem | Sort-Object LastWriteTime -Descending"
+}
+
+
+# Log directories already created by this process
+_ENSURED_LOG_DIRS = set()
+
+# sys.platform is a constant string; platform.system() costs an import and a uname call
+_IS_WINDOWS = sys.platform.startswith("win")
+
+# Shell inferred from the parent process and platform; neither changes while we run
+_DETECTED_SHELL: Optional[str] = None
+
+# Suggestions shown when an input is not understood
+_EXAMPLES = (
+    "go to downloads",
+    "list files",
+    "create folder my-project",
+    "find files containing config",
+    "show disk space",
+)
+_EXAMPLES_BLOCK = "\n".join(f"  • {example}" for example in _EXAMPLES)
+
+
 class CMDNLPParser:
     """Natural language parser for Windows CMD and PowerShell commands"""
 
     CONFIG_FILE = "cmd_nlp_config.json"
 
+    # Built-in patterns (and their by-category index) per parser class, built once and
+    # shared by every instance
+    _builtin_patterns: Dict[type, Tuple[List[CommandPattern], Dict[str, List[CommandPattern]]]] = {}
+
     def __init__(self, log_file: str = "logs/command_history.jsonl", dry_run: bool = False, 
                  no_emoji: bool = False, config_file: Optional[str] = None, 
                  history_file: str = ".nlp_history", shell: str = ShellType.AUTO):
-        self.patterns: List[CommandPattern] = []
         self.log_file = log_file
         self.dry_run = dry_run
         self.no_emoji = no_emoji
         self.config_file = config_file or self.CONFIG_FILE
         self.history_file = history_file
         self.shell_mode = shell
-        self.custom_patterns: List[Dict[str, Any]] = []
+        self._log_fh = None  # Opened on first log_command and kept for the process
+        self._log_unflushed = 0
+        self._log_flushed_at = 0.0
+        self._ts_cache: Tuple[int, str] = (-1, "")  # (epoch second, formatted ISO prefix)
+        self._setup_formatting()
         
         # Auto-detect shell if needed
         if self.shell_mode == ShellType.AUTO:
             self.shell_mode = self._detect_shell()
         
+        # Patterns are built on first use (see _ensure_patterns), so --stats and other
+        # pattern-free paths skip compiling them
+        self._patterns_ready = False
+        self._setup_logging()
+
+    def _ensure_patterns(self) -> None:
+        """Build the patterns and dispatch tables if this parser has not done so yet"""
+        if not self._patterns_ready:
+            self._init_patterns()
+
+    def _init_patterns(self) -> None:
+        """Build built-in and custom patterns and the dispatch tables"""
+        self._patterns: List[CommandPattern] = []
+        self._by_category: Dict[str, List[CommandPattern]] = {}
+        self._custom_patterns: List[Dict[str, Any]] = []
         self._setup_patterns()
         self._load_custom_patterns()
-        self._setup_logging()
+        self._build_dispatch()
+        self._patterns_ready = True
+
+    @property
+    def patterns(self) -> List[CommandPattern]:
+        """All command patterns in match order, built-in first"""
+        self._ensure_patterns()
+        return self._patterns
+
+    @property
+    def custom_patterns(self) -> List[Dict[str, Any]]:
+        """Config entries loaded as custom patterns"""
+        self._ensure_patterns()
+        return self._custom_patterns
 
     def _detect_shell(self) -> str:
         """Detect the current shell environment"""
@@ -101,6 +433,16 @@ class CMDNLPParser:
         if os.environ.get('POWERSHELL_DISTRIBUTION_CHANNEL'):
             return ShellType.POWERSHELL
         
+        # The remaining checks are slow (psutil walks the process table) but their
+        # answer is fixed for the process, so only the first parser pays for them
+        global _DETECTED_SHELL
+        if _DETECTED_SHELL is None:
+            _DETECTED_SHELL = self._detect_shell_from_process()
+        return _DETECTED_SHELL
+
+    @staticmethod
+    def _detect_shell_from_process() -> str:
+        """Detect the shell from the parent process name, then the platform"""
         # Check for pwsh or powershell in parent process
         try:
             import psutil
@@ -113,7 +455,7 @@ class CMDNLPParser:
             pass
         
         # Default to CMD on Windows
-        if platform.system() == 'Windows':
+        if _IS_WINDOWS:
             return ShellType.CMD
         
         # On non-Windows, default to PowerShell-compatible commands
@@ -122,11 +464,23 @@ class CMDNLPParser:
     def _add_pattern(self, pattern: str, generators: Union[Callable, Dict[str, Callable]], 
                      description: str, safe: bool = True, category: str = "general") -> None:
         """Helper to add a pattern with proper categorization"""
-        self.patterns.append(CommandPattern(pattern, generators, description, safe, category))
+        command_pattern = CommandPattern(pattern, generators, description, safe, category)
+        self._patterns.append(command_pattern)
+        self._by_category.setdefault(category, []).append(command_pattern)
 
     def _setup_patterns(self) -> None:
         """Initialize all command patterns by category"""
-        # Order matters: more specific patterns should come before general ones
+        cached = self._builtin_patterns.get(type(self))
+        if cached is not None:
+            patterns, by_category = cached
+            self._patterns = list(patterns)
+            # Copy the lists too, so custom patterns added later stay per instance
+            self._by_category = {category: list(group) for category, group in by_category.items()}
+            return
+
+        # Order matters: more specific patterns should come before general ones.
+        # Patterns must match the whole (stripped) input: CommandPattern.match uses
+        # fullmatch, so trailing text never slips past a pattern or cuts a capture short
         self._setup_navigation_patterns()
         self._setup_file_operation_patterns()
         self._setup_system_patterns()
@@ -137,13 +491,17 @@ class CMDNLPParser:
         self._setup_file_property_patterns()
         self._setup_text_file_patterns()
         self._setup_alias_patterns()
+        self._builtin_patterns[type(self)] = (
+            list(self._patterns),
+            {category: list(group) for category, group in self._by_category.items()}
+        )
 
     def _setup_navigation_patterns(self) -> None:
         """Navigation-related command patterns"""
         self._add_pattern(
             r"go to (.+)",
             {
-                ShellType.CMD: lambda m: f"cd {m.group(1).strip().title()}",
+                ShellType.CMD: lambda m: f"cd {m.group(1).strip()}",
                 ShellType.POWERSHELL: lambda m: f"Set-Location -Path '{m.group(1).strip()}'"
             },
             "Change directory",
@@ -161,17 +519,7 @@ class CMDNLPParser:
             category="navigation"
         )
         self._add_pattern(
-            r"show (current directory|current path)",
-            {
-                ShellType.CMD: lambda m: "cd",
-                ShellType.POWERSHELL: lambda m: "Get-Location"
-            },
-            "Show current directory",
-            safe=True,
-            category="navigation"
-        )
-        self._add_pattern(
-            r"where am i",
+            r"show current directory|show current path|where am i",
             {
                 ShellType.CMD: lambda m: "cd",
                 ShellType.POWERSHELL: lambda m: "Get-Location"
@@ -187,16 +535,8 @@ class CMDNLPParser:
         self._add_pattern(
             r"list files (?:sorted|sort) by (size|name|date)",
             {
-                ShellType.CMD: lambda m: {
-                    "size": "dir /O-S",
-                    "name": "dir /O-N",
-                    "date": "dir /O-D"
-                }.get(m.group(1).lower(), "dir"),
-                ShellType.POWERSHELL: lambda m: {
-                    "size": "Get-ChildItem | Sort-Object Length -Descending",
-                    "name": "Get-ChildItem | Sort-Object Name",
-                    "date": "Get-ChildItem | Sort-Object LastWriteTime -Descending"
-                }.get(m.group(1).lower(), "Get-ChildItem")
+                ShellType.CMD: lambda m: _SORTED_LIST_CMD.get(m.group(1).lower(), "dir"),
+                ShellType.POWERSHELL: lambda m: _SORTED_LIST_PS.get(m.group(1).lower(), "Get-ChildItem")
             },
             "List files sorted",
             safe=True,
@@ -302,17 +642,7 @@ class CMDNLPParser:
             category="system"
         )
         self._add_pattern(
-            r"show ip address",
-            {
-                ShellType.CMD: lambda m: "ipconfig",
-                ShellType.POWERSHELL: lambda m: "Get-NetIPAddress -AddressFamily IPv4 | Where-Object {$_.InterfaceAlias -notlike '*Loopback*'}"
-            },
-            "Show IP address",
-            safe=True,
-            category="system"
-        )
-        self._add_pattern(
-            r"show my ip",
+            r"show ip address|show my ip",
             {
                 ShellType.CMD: lambda m: "ipconfig",
                 ShellType.POWERSHELL: lambda m: "Get-NetIPAddress -AddressFamily IPv4 | Where-Object {$_.InterfaceAlias -notlike '*Loopback*'}"
@@ -563,31 +893,42 @@ class CMDNLPParser:
             return
 
         try:
-            with open(self.config_file, "r") as f:
-                config = json.load(f)
+            # Decode the raw bytes directly: orjson (or json) reads UTF-8 itself, skipping
+            # a text-mode decode and the platform's default encoding
+            with open(self.config_file, "rb") as f:
+                config = _json_loads(f.read())
+
+            custom_patterns = config.get("patterns", []) if isinstance(config, dict) else None
+            if not isinstance(custom_patterns, list):
+                if not self.no_emoji:
+                    print("⚠️  Warning: Config file has no 'patterns' list")
+                return
 
-            custom_patterns = config.get("patterns", [])
             for p in custom_patterns:
-                try:
-                    pattern = p.get("pattern")
-                    cmd_template = p.get("cmd_command") or p.get("command")
-                    ps_template = p.get("ps_command") or cmd_template
-                    description = p.get("description", "Custom pattern")
-                    safe = p.get("safe", True)
-                    category = p.get("category", "custom")
+                # Check each entry's shape up front; only the regex itself can still fail
+                error = _custom_pattern_error(p)
+                if error:
+                    if not self.no_emoji:
+                        print(f"⚠️  Warning: Failed to load custom pattern: {error}")
+                    continue
 
-                    if not pattern or not cmd_template:
-                        continue
+                pattern = p.get("pattern")
+                cmd_template = p.get("cmd_command") or p.get("command")
+                ps_template = p.get("ps_command") or cmd_template
+                description = p.get("description", "Custom pattern")
+                safe = p.get("safe", True)
+                category = p.get("category", "custom")
 
-                    # Create generators for each shell
-                    def make_generator(template):
-                        return lambda m: self._substitute_groups(template, m)
+                if not pattern or not cmd_template:
+                    continue
 
-                    generators = {
-                        ShellType.CMD: make_generator(cmd_template),
-                        ShellType.POWERSHELL: make_generator(ps_template)
-                    }
+                # Create generators for each shell
+                generators = {
+                    ShellType.CMD: _compile_template(cmd_template),
+                    ShellType.POWERSHELL: _compile_template(ps_template)
+                }
 
+                try:
                     self._add_pattern(
                         pattern,
                         generators,
@@ -595,38 +936,153 @@ class CMDNLPParser:
                         safe,
                         category
                     )
-                    self.custom_patterns.append(p)
-                except Exception as e:
+                except re.error as e:
                     if not self.no_emoji:
                         print(f"⚠️  Warning: Failed to load custom pattern: {e}")
+                    continue
+                self._custom_patterns.append(p)
 
-        except json.JSONDecodeError as e:
+        except ValueError as e:  # JSONDecodeError or invalid UTF-8
             if not self.no_emoji:
                 print(f"⚠️  Warning: Invalid JSON in config file: {e}")
         except IOError as e:
             if not self.no_emoji:
                 print(f"⚠️  Warning: Could not read config file: {e}")
 
-    def _substitute_groups(self, template: str, match) -> str:
-        """Substitute regex match groups into command template"""
-        result = template
-        for i in range(1, match.lastindex + 1 if match.lastindex else 1):
-            placeholder = f"{{{i}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, match.group(i))
-        return result
+    def _build_dispatch(self) -> None:
+        """Group patterns by first word and combine each group into one alternation regex"""
+        tokens = [p.first_tokens for p in self._patterns]
+        # Patterns without a fixed first word can match anything, so every bucket keeps them
+        fallback = [i for i, t in enumerate(tokens) if t is None]
+        self._fallback_bucket = self._make_bucket(fallback)
+        self._buckets: Dict[str, Tuple[Optional[re.Pattern], List[int]]] = {}
+        for word in sorted(set().union(*(t for t in tokens if t))):
+            indices = [i for i, t in enumerate(tokens) if t is None or word in t]
+            self._buckets[word] = self._make_bucket(indices)
+
+        # Results depend on the pattern set, so any rebuild starts a fresh cache
+        self._parse_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], Optional[CommandPattern]]]" = OrderedDict()
+
+        # Inputs that exactly equal a literal pattern ("ls", "go back") skip the regex
+        # engine; only group-free winners are cached so the match is case-independent
+        self._literal: Dict[str, Tuple[int, re.Match]] = {}
+        for pattern in self._patterns:
+            for literal in _literal_alternatives(pattern.pattern.pattern) or ():
+                index, match = self._find_pattern(literal)
+                if match and self._patterns[index].pattern.groups == 0:
+                    self._literal.setdefault(literal, (index, match))
+
+        # Their commands are fixed strings too, so precompute them per shell
+        self._exact: Dict[str, Dict[str, Tuple[str, CommandPattern]]] = {}
+        for literal, (index, match) in self._literal.items():
+            pattern = self._patterns[index]
+            results = {}
+            for shell in [ShellType.CMD, ShellType.POWERSHELL]:
+                command = pattern.get_command(shell, match)
+                if command:
+                    results[shell] = (command, pattern)
+            self._exact[literal] = results
+
+    def _make_bucket(self, indices: List[int]) -> Tuple[Optional[re.Pattern], List[int]]:
+        """Build (combined regex, pattern indices) for a bucket of patterns"""
+        # Each pattern becomes an outer group named p<index>; since the outer group
+        # closes last, match.lastgroup names the winning alternative
+        parts = []
+        for i in indices:
+            source = self._patterns[i].pattern.pattern
+            if _BACKREFERENCE_RE.search(source):
+                # Group numbers shift inside the combined regex, so group references break
+                return None, indices
+            parts.append(f"(?P<p{i}>{source})")
+
+        combined = self._compile_combined("|".join(parts)) if parts else None
+        return combined, indices
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _compile_combined(source: str) -> Optional[re.Pattern]:
+        """Compile the combined regex with stdlib re"""
+        try:
+            return re.compile(source, re.IGNORECASE)
+        except re.error:
+            # e.g. duplicate group names across custom patterns; fall back to linear scan
+            return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _compile_combined_re2(source: str) -> Optional[Any]:
+        """Compile the combined regex with RE2's linear-time engine, if installed"""
+        # Only reached on the first long input per bucket, so short-input sessions never
+        # pay for RE2 compilation
+        if not RE2_AVAILABLE:
+            return None
+        try:
+            return re2.compile(f"(?i){source}")
+        except re2.error:
+            return None  # Uses features RE2 lacks (e.g. lookaround); stdlib re handles it
+
+    def _find_pattern(self, text: str, start: int = 0,
+                      lowered: Optional[str] = None) -> Tuple[Optional[int], Optional[re.Match]]:
+        """
+        Find the first pattern matching text
+
+        Args:
+            text: Stripped natural language input
+            start: Index of the first pattern to consider
+            lowered: text.lower(), if the caller already has it
+
+        Returns:
+            Tuple of (pattern index, match) or (None, None) if no match
+        """
+        if lowered is None:
+            lowered = text.lower()
+        if start == 0:
+            hit = self._literal.get(lowered)
+            if hit:
+                return hit
+
+        first_word = lowered.split(" ", 1)[0]
+        combined, indices = self._buckets.get(first_word, self._fallback_bucket)
+
+        if start == 0 and combined is not None:
+            # RE2's binding costs ~10 us per call, so it only pays off on long inputs
+            # where backtracking in stdlib re could blow up
+            if RE2_AVAILABLE and len(text) >= _RE2_MIN_LENGTH:
+                combined = self._compile_combined_re2(combined.pattern) or combined
+            combined_match = combined.fullmatch(text)
+            if not combined_match:
+                return None, None
+            index = int(combined_match.lastgroup[1:])
+            # Re-match the winner alone so generators see their own group numbers
+            return index, self._patterns[index].match(text)
+
+        for index in indices:
+            if index < start:
+                continue
+            match = self._patterns[index].match(text)
+            if match:
+                return index, match
+        return None, None
 
     def _setup_logging(self) -> None:
-        """Setup logging directory"""
+        """Setup logging directory, creating each directory at most once per process"""
         log_dir = os.path.dirname(self.log_file)
-        if log_dir:
+        if not log_dir:
+            return
+        # Keyed on the absolute path: a relative log_dir names a new directory after chdir
+        log_dir = os.path.abspath(log_dir)
+        if log_dir not in _ENSURED_LOG_DIRS:
             os.makedirs(log_dir, exist_ok=True)
+            _ENSURED_LOG_DIRS.add(log_dir)
 
-    def _fmt(self, emoji: str, text: str) -> str:
-        """Format output with optional emoji"""
+    def _setup_formatting(self) -> None:
+        """Bind _fmt and _warn for the emoji setting once, rather than branching per message"""
         if self.no_emoji:
-            return text
-        return f"{emoji} {text}"
+            self._fmt: Callable[[str, str], str] = lambda emoji, text: text
+            self._warn: Callable[[str], None] = lambda message: print(f"Warning: {message}")
+        else:
+            self._fmt = lambda emoji, text: f"{emoji} {text}"
+            self._warn = lambda message: print(f"⚠️  Warning: {message}")
 
     @property
     def shell_name(self) -> str:
@@ -646,16 +1102,36 @@ class CMDNLPParser:
         Returns:
             Tuple of (command, pattern) or (None, None) if no match
         """
+        self._ensure_patterns()
         text = text.strip()
 
-        for pattern in self.patterns:
-            match = pattern.match(text)
-            if match:
-                command = pattern.get_command(self.shell_mode, match)
-                if command:
-                    return command, pattern
+        lowered = text.lower()  # Computed once for the exact table and dispatch
+        exact = self._exact.get(lowered)
+        if exact and self.shell_mode in exact:
+            return exact[self.shell_mode]
+
+        # Keyed on the original case, since captured paths and names keep it
+        key = (self.shell_mode, text)
+        cache = self._parse_cache
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            return result
+
+        result = None, None
+        index, match = self._find_pattern(text, lowered=lowered)
+        while match:
+            pattern = self._patterns[index]
+            command = pattern.get_command(self.shell_mode, match)
+            if command:
+                result = command, pattern
+                break
+            index, match = self._find_pattern(text, index + 1, lowered)
 
-        return None, None
+        cache[key] = result
+        if len(cache) > _PARSE_CACHE_MAX:
+            cache.popitem(last=False)
+        return result
 
     def parse_all(self, text: str) -> Dict[str, Tuple[Optional[str], Optional[CommandPattern]]]:
         """
@@ -667,25 +1143,57 @@ class CMDNLPParser:
         Returns:
             Dict mapping shell type to (command, pattern) tuple
         """
+        self._ensure_patterns()
         text = text.strip()
-        results = {}
 
-        for pattern in self.patterns:
-            match = pattern.match(text)
-            if match:
-                for shell in [ShellType.CMD, ShellType.POWERSHELL]:
-                    command = pattern.get_command(shell, match)
-                    if command:
-                        results[shell] = (command, pattern)
-                return results
+        lowered = text.lower()
+        exact = self._exact.get(lowered)
+        if exact is not None:
+            return dict(exact)
+
+        results = {}
+        index, match = self._find_pattern(text, lowered=lowered)
+        if match:
+            pattern = self._patterns[index]
+            for shell in [ShellType.CMD, ShellType.POWERSHELL]:
+                command = pattern.get_command(shell, match)
+                if command:
+                    results[shell] = (command, pattern)
 
         return results
 
+    def _timestamp(self) -> str:
+        """Current UTC time in ISO 8601, formatting the date/time part once per second"""
+        seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+        if seconds != self._ts_cache[0]:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+            self._ts_cache = (seconds, prefix)
+        return f"{self._ts_cache[1]}.{micros:06d}+00:00"
+
+    def parse_many(self, texts: Iterable[str]) -> List[Tuple[Optional[str], Optional[CommandPattern]]]:
+        """
+        Parse a batch of natural language inputs, e.g. when replaying command history
+
+        Args:
+            texts: Natural language inputs
+
+        Returns:
+            List of (command, pattern) tuples in input order, (None, None) for no match
+        """
+        parse = self.parse
+        return [parse(text) for text in texts]
+
     def log_command(self, input_text: str, command: str, pattern: CommandPattern, 
                     executed: bool, shell: str = None) -> None:
-        """Log command to history file"""
+        """
+        Log command to history file
+
+        Entries are buffered and written in batches; execute() flushes after each
+        command, while direct callers should close() the parser (or use it as a context
+        manager) to write out the last batch.
+        """
         entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": self._timestamp(),
             "input": input_text,
             "command": command,
             "shell": shell or self.shell_mode,
@@ -696,21 +1204,55 @@ class CMDNLPParser:
         }
 
         try:
-            with open(self.log_file, "a") as f:
-                f.write(json.dumps(entry) + "\n")
+            if self._log_fh is None:
+                # Binary, so orjson's bytes go straight into the buffer; entries are
+                # flushed in batches below and on exit
+                self._log_fh = open(self.log_file, "ab", buffering=_LOG_BUFFER_SIZE)
+                atexit.register(self._log_fh.close)
+                self._log_flushed_at = time.monotonic()
+            self._log_fh.write(_json_dumps_line(entry))
+            self._log_unflushed += 1
+            now = time.monotonic()
+            if (self._log_unflushed >= _LOG_FLUSH_ENTRIES
+                    or now - self._log_flushed_at >= _LOG_FLUSH_SECONDS):
+                self._flush_log(now)
+        except ValueError:
+            pass  # Handle already closed at interpreter exit
         except IOError as e:
-            if not self.no_emoji:
-                print(f"⚠️  Warning: Could not write to log file: {e}")
-            else:
-                print(f"Warning: Could not write to log file: {e}")
+            self._warn(f"Could not write to log file: {e}")
+
+    def _flush_log(self, now: Optional[float] = None) -> None:
+        """Write any buffered log entries to disk"""
+        if self._log_fh is None or self._log_fh.closed:
+            return
+        self._log_fh.flush()
+        self._log_unflushed = 0
+        self._log_flushed_at = time.monotonic() if now is None else now
+
+    def close(self) -> None:
+        """Flush and close the command log; a later log_command reopens it"""
+        if self._log_fh is None:
+            return
+        atexit.unregister(self._log_fh.close)
+        self._log_fh.close()
+        self._log_fh = None
+        self._log_unflushed = 0
 
-    def execute(self, text: str, auto_confirm: bool = False) -> bool:
+    def __enter__(self) -> "CMDNLPParser":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def execute(self, text: str, auto_confirm: bool = False, quiet: bool = False) -> bool:
         """
         Parse and execute natural language command
 
         Args:
             text: Natural language input
             auto_confirm: If True, execute unsafe commands without confirmation
+            quiet: If True, skip the input/intent banner and status lines (for scripts);
+                a dry run prints just the bare command
 
         Returns:
             True if command was executed, False otherwise
@@ -723,140 +1265,234 @@ class CMDNLPParser:
             self._show_examples()
             return False
 
-        print(f"\n{self._fmt('📝', f'Input: {text}')}")
-        print(self._fmt("🎯", f"Intent: {pattern.description}"))
-        print(self._fmt("⚡", f"[{self.shell_name}] {command}"))
+        needs_confirm = not pattern.safe and not auto_confirm
+        # Always show what is about to run when the user has to confirm it
+        if not quiet or needs_confirm:
+            # One write for the whole banner rather than a print per line
+            sys.stdout.write("\n".join([
+                "",
+                self._fmt("📝", f"Input: {text}"),
+                self._fmt("🎯", f"Intent: {pattern.description}"),
+                self._fmt("⚡", f"[{self.shell_name}] {command}"),
+            ]) + "\n")
 
         # Check if safe
-        if not pattern.safe and not auto_confirm:
+        if needs_confirm:
             print(f"\n{self._fmt('⚠️', 'This is a destructive command!')}")
             confirm = input("Execute? (y/n): ").strip().lower()
             if confirm != "y":
                 print(self._fmt("❌", "Cancelled"))
                 self.log_command(text, command, pattern, executed=False)
+                self._flush_log()
                 return False
 
         # Execute or dry run
         if self.dry_run:
-            print(self._fmt("🔍", "Dry run: Command not executed"))
+            if quiet:
+                print(command)
+            else:
+                print(self._fmt("🔍", "Dry run: Command not executed"))
             self.log_command(text, command, pattern, executed=False)
+            # One entry per execute, so write it out now: a crash or another process's
+            # show_stats then sees it, and a caller need not close() the parser
+            self._flush_log()
             return True
 
-        print(self._fmt("✅", "Executing..."))
+        if not quiet:
+            print(self._fmt("✅", "Executing..."))
         
         # Actually execute the command
         executed = self._run_command(command)
-        if executed:
+        if executed and not quiet:
             print(self._fmt("✨", "Done!"))
         return executed
 
-    def _run_command(self, command: str) -> bool:
+    def _run_command(self, command: str, capture: bool = False) -> bool:
         """
         Execute a command using the appropriate shell
-        
+
+        Args:
+            command: Shell command to run
+            capture: If True, collect the output through pipes and print it afterwards;
+                by default the child writes straight to this process's console
+
         Returns:
             True if command executed successfully, False otherwise
         """
+        import subprocess  # Deferred: parse-only and dry-run invocations never need it
+
         try:
             if self.shell_mode == ShellType.POWERSHELL:
                 # Use PowerShell to execute
-                result = subprocess.run(
-                    ["pwsh", "-NoProfile", "-Command", command],
-                    capture_output=True,
-                    text=True,
-                    shell=False
-                )
+                args = ["pwsh", "-NoProfile", "-Command", command]
             else:
                 # Use CMD to execute
-                result = subprocess.run(
-                    ["cmd", "/c", command],
-                    capture_output=True,
-                    text=True,
-                    shell=False
-                )
+                args = ["cmd", "/c", command]
+
+            if capture:
+                result = subprocess.run(args, capture_output=True, text=True, shell=False)
+            else:
+                # Our banner is still buffered; emit it before the child's output
+                sys.stdout.flush()
+                result = subprocess.run(args, shell=False)
             
             if result.returncode == 0:
                 if result.stdout:
                     print(result.stdout)
                 return True
             else:
-                if not self.no_emoji:
-                    print(f"❌ Command failed with exit code {result.returncode}")
-                else:
-                    print(f"Command failed with exit code {result.returncode}")
+                print(self._fmt("❌", f"Command failed with exit code {result.returncode}"))
                 if result.stderr:
                     print(result.stderr)
                 return False
         except FileNotFoundError as e:
             shell_exe = "pwsh" if self.shell_mode == ShellType.POWERSHELL else "cmd.exe"
-            if not self.no_emoji:
-                print(f"⚠️  {shell_exe} not available. Command logged but not executed.")
-            else:
-                print(f"Warning: {shell_exe} not available. Command logged but not executed.")
+            self._warn(f"{shell_exe} not available. Command logged but not executed.")
             return True  # Still return True since we logged it
         except Exception as e:
-            if not self.no_emoji:
-                print(f"❌ Error executing command: {e}")
-            else:
-                print(f"Error executing command: {e}")
+            print(self._fmt("❌", f"Error executing command: {e}"))
             return False
 
     def _show_examples(self) -> None:
         """Show example patterns"""
-        examples = [
-            "go to downloads",
-            "list files",
-            "create folder my-project",
-            "find files containing config",
-            "show disk space",
-        ]
-        for example in examples:
-            print(f"  • {example}")
+        print(_EXAMPLES_BLOCK)
+
+    @staticmethod
+    def _decode_log_line(line: bytes) -> Optional[Dict[str, Any]]:
+        """Decode one command log line, or None if it is blank, malformed or not an object"""
+        # Only a {...} line can hold an entry; this also skips blank lines, stray
+        # values and crash-truncated writes without calling the decoder
+        stripped = line.strip()
+        if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+            return None
+        try:
+            return _json_loads(stripped)
+        except ValueError:  # JSONDecodeError or invalid UTF-8
+            try:
+                # orjson rejects escaped lone surrogates that json wrote and accepts
+                return json.loads(stripped)
+            except ValueError:
+                return None
+
+    def _read_log_entries(self, mm: mmap.mmap) -> Iterator[Dict[str, Any]]:
+        """
+        Yield decoded entries from the mapped command log, starting at its current position
+
+        Blank, malformed or non-object lines are skipped. A last line without a newline may
+        still be being written, so it is left unread with the position at its start.
+        """
+        # Each line is sliced from the map as bytes, which both orjson and json decode
+        # directly, rather than going through a text decoder
+        decode = self._decode_log_line
+        for line in iter(mm.readline, b""):
+            if not line.endswith(b"\n"):
+                mm.seek(-len(line), os.SEEK_CUR)
+                return
+            entry = decode(line)
+            if entry is not None:
+                yield entry
+
+    def _load_stats_snapshot(self, mm: mmap.mmap) -> Optional[Dict[str, Any]]:
+        """Load the saved tallies for the start of the log, if they still describe it"""
+        try:
+            with open(self.log_file + _STATS_SNAPSHOT_SUFFIX, "rb") as f:
+                snapshot = _json_loads(f.read())
+            offset = snapshot["offset"]
+            tail = bytes.fromhex(snapshot["tail"])
+            if not (isinstance(offset, int) and len(tail) <= offset <= len(mm)
+                    and mm[offset - len(tail):offset] == tail):
+                return None  # The log was truncated, rotated or rewritten
+            return {
+                "offset": offset,
+                "total": int(snapshot["total"]),
+                "executed": int(snapshot["executed"]),
+                "safe": int(snapshot["safe"]),
+                "categories": Counter(snapshot["categories"]),
+                "patterns": Counter(snapshot["patterns"]),
+                "shells": Counter(snapshot["shells"])
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # Missing or unreadable snapshot: rescan from the start
+
+    def _save_stats_snapshot(self, tallies: Dict[str, Any]) -> None:
+        """Write tallies next to the log, replacing the old snapshot atomically"""
+        path = self.log_file + _STATS_SNAPSHOT_SUFFIX
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(_json_dumps_line(tallies))
+            os.replace(path + ".tmp", path)
+        except (OSError, TypeError, ValueError):  # orjson raises TypeError subclasses
+            pass  # Best effort; the next show_stats just reads more of the log
+
+    def _tally_log(self) -> Dict[str, Any]:
+        """Count the command log's entries, reading only lines added since the last call"""
+        with open(self.log_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return _empty_tallies()  # An empty file cannot be memory-mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                tallies = self._load_stats_snapshot(mm) or _empty_tallies()
+                start = tallies["offset"]
+                mm.seek(start)
+
+                # Tally into locals (cheaper than dict item stores) and store them once
+                total, executed, safe = tallies["total"], tallies["executed"], tallies["safe"]
+                categories = tallies["categories"]
+                patterns = tallies["patterns"]
+                shells = tallies["shells"]
+                for entry in self._read_log_entries(mm):
+                    total += 1
+                    get = entry.get
+                    if get("executed"):
+                        executed += 1
+                    if get("safe"):
+                        safe += 1
+
+                    categories[get("category", "unknown")] += 1
+                    patterns[get("pattern_description", "unknown")] += 1
+                    shells[get("shell", "unknown")] += 1
+
+                offset = mm.tell()
+                tail = mm[max(0, offset - _STATS_SNAPSHOT_TAIL):offset]
+                # An unterminated last line is counted if it already holds a whole entry
+                # (e.g. a hand-edited log), but kept out of the snapshot so it is re-read
+                partial = self._decode_log_line(mm[offset:]) if offset < len(mm) else None
+
+        # A null or numeric category/description (e.g. from a custom pattern) is counted
+        # under its printed form, as a JSON snapshot can only keep string keys
+        for counter in (categories, patterns, shells):
+            for key in [k for k in counter if not isinstance(k, str)]:
+                counter[str(key)] += counter.pop(key)
+
+        tallies.update(offset=offset, total=total, executed=executed, safe=safe)
+        if offset != start:
+            self._save_stats_snapshot(dict(tallies, tail=tail.hex()))
+
+        if partial is not None:
+            get = partial.get
+            tallies["total"] += 1
+            if get("executed"):
+                tallies["executed"] += 1
+            if get("safe"):
+                tallies["safe"] += 1
+            for name, field in (("categories", "category"), ("patterns", "pattern_description"),
+                                ("shells", "shell")):
+                key = get(field, "unknown")
+                tallies[name][key if isinstance(key, str) else str(key)] += 1
+        return tallies
 
     def show_stats(self) -> None:
         """Show statistics from command history"""
+        self._flush_log()  # Include entries still buffered by this process
         if not os.path.exists(self.log_file):
             print("No command history yet")
             return
 
-        stats = {
-            "total": 0,
-            "executed": 0,
-            "safe": 0,
-            "destructive": 0,
-            "categories": {},
-            "patterns": {},
-            "shells": {}
-        }
-
         try:
-            with open(self.log_file, "r") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    try:
-                        entry = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-                    stats["total"] += 1
-                    if entry.get("executed"):
-                        stats["executed"] += 1
-                    if entry.get("safe"):
-                        stats["safe"] += 1
-                    else:
-                        stats["destructive"] += 1
-
-                    category = entry.get("category", "unknown")
-                    stats["categories"][category] = stats["categories"].get(category, 0) + 1
-
-                    pattern = entry.get("pattern_description", "unknown")
-                    stats["patterns"][pattern] = stats["patterns"].get(pattern, 0) + 1
-                    
-                    shell = entry.get("shell", "unknown")
-                    stats["shells"][shell] = stats["shells"].get(shell, 0) + 1
+            stats = self._tally_log()
         except IOError as e:
             print(f"Error reading log file: {e}")
             return
+        stats["destructive"] = stats["total"] - stats["safe"]
 
         print(self._fmt("📊", "Command Statistics:"))
         print(f"  Total commands: {stats['total']}")
@@ -871,24 +1507,22 @@ class CMDNLPParser:
 
         if stats["categories"]:
             print(self._fmt("📁", "Commands by category:"))
-            sorted_categories = sorted(stats["categories"].items(), key=lambda x: x[1], reverse=True)
+            # Every category is printed, so this stays a full sort; itemgetter keeps the key in C
+            sorted_categories = sorted(stats["categories"].items(), key=operator.itemgetter(1), reverse=True)
             for category, count in sorted_categories:
                 print(f"  • {category}: {count}")
 
         if stats["patterns"]:
             print(self._fmt("🔢", "Most used patterns:"))
-            sorted_patterns = sorted(stats["patterns"].items(), key=lambda x: x[1], reverse=True)
-            for pattern, count in sorted_patterns[:5]:
+            # most_common(n) selects with heapq.nlargest rather than sorting every pattern
+            for pattern, count in stats["patterns"].most_common(5):
                 print(f"  • {pattern}: {count}")
 
     def get_patterns_by_category(self) -> Dict[str, List[CommandPattern]]:
         """Get all patterns organized by category"""
-        categories: Dict[str, List[CommandPattern]] = {}
-        for pattern in self.patterns:
-            if pattern.category not in categories:
-                categories[pattern.category] = []
-            categories[pattern.category].append(pattern)
-        return categories
+        self._ensure_patterns()
+        # Copied from the index kept by _add_pattern, so callers may edit the result freely
+        return {category: list(group) for category, group in self._by_category.items()}
 
     def show_patterns(self) -> None:
         """Display all available patterns organized by category"""
@@ -905,8 +1539,9 @@ class CMDNLPParser:
             print()
 
 
-def main():
-    """CLI interface"""
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> "argparse.ArgumentParser":
+    """Build the CLI argument parser once; parse_args leaves it unchanged, so it is reusable"""
     import argparse
 
     parser = argparse.ArgumentParser(description="Windows CMD/PowerShell NLP Parser")
@@ -921,8 +1556,20 @@ def main():
     parser.add_argument("--shell", choices=["cmd", "powershell", "auto"], default="auto",
                         help="Shell to use: cmd, powershell, or auto (default: auto)")
     parser.add_argument("--show-both", action="store_true", help="Show both CMD and PowerShell commands")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Skip the input/intent banner and status lines (for scripts)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    CLI interface
 
-    args = parser.parse_args()
+    Args:
+        argv: Arguments to parse instead of sys.argv[1:], e.g. when called from tests
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
 
     # Map CLI args to shell types
     shell_map = {
@@ -972,6 +1619,8 @@ def main():
         session = None
         if PROMPT_TOOLKIT_AVAILABLE:
             try:
+                from prompt_toolkit import PromptSession
+                from prompt_toolkit.history import FileHistory
                 session = PromptSession(
                     history=FileHistory(cmd_nlp.history_file),
                     enable_history_search=True
@@ -995,14 +1644,14 @@ def main():
                     break
                 if not text:
                     continue
-                cmd_nlp.execute(text, auto_confirm=args.auto_confirm)
+                cmd_nlp.execute(text, auto_confirm=args.auto_confirm, quiet=args.quiet)
                 print()
             except KeyboardInterrupt:
                 goodbye = "Goodbye!" if args.no_emoji else "👋 Goodbye!"
                 print(f"\n{goodbye}")
                 break
     elif args.command:
-        cmd_nlp.execute(args.command, auto_confirm=args.auto_confirm)
+        cmd_nlp.execute(args.command, auto_confirm=args.auto_confirm, quiet=args.quiet)
     else:
         parser.print_help()
 
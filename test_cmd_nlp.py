@@ -6,79 +6,127 @@ Cross-platform command generation tests
 
 import sys
 import os
+import json
+import tempfile
+from typing import Tuple
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from cmd_nlp import CMDNLPParser, ShellType
+from cmd_nlp import (CMDNLPParser, ShellType, _split_alternatives, _first_tokens, _group_end,
+                     _expand_optional_literals, _literal_alternatives)
+
+CMD_TEST_CASES: Tuple[Tuple[str, str, str], ...] = (
+    # (input, expected_command_start, description)
+    ("go to downloads", "cd downloads", "Navigation: go to directory"),
+    ("go back", "cd ..", "Navigation: go back"),
+    ("show current directory", "cd", "Navigation: show current directory"),
+    ("where am i", "cd", "Navigation: where am i"),
+    ("list files", "dir", "Files: list files"),
+    ("list files sorted by size", "dir /O-S", "Files: list by size"),
+    ("list files sorted by name", "dir /O-N", "Files: list by name"),
+    ("create folder my-project", "mkdir my-project", "Files: create folder"),
+    ("create directory test", "mkdir test", "Files: create directory"),
+    ("delete file readme.txt", 'del "readme.txt"', "Files: delete file"),
+    ("delete folder old-stuff", 'rmdir /s /q "old-stuff"', "Files: delete folder"),
+    ("open notepad", "start notepad", "System: open program"),
+    ("clear", "cls", "System: clear screen"),
+    ("show disk space", "wmic logicaldisk", "System: disk space"),
+    ("show ip address", "ipconfig", "System: IP address"),
+    ("show my ip", "ipconfig", "System: my IP"),
+    ("show date", "date /t", "System: show date"),
+    ("show time", "time /t", "System: show time"),
+    ("find files containing config", "dir /s /b | findstr", "Search: find files"),
+    ("find text error in files", "findstr /s /i", "Search: find text"),
+    ("copy file1.txt to backup", 'copy "file1.txt" "backup"', "Files: copy"),
+    ("move file.txt to archive", 'move "file.txt" "archive"', "Files: move"),
+    ("show running processes", "tasklist", "Process: list processes"),
+    ("kill process notepad", 'taskkill /F /IM "notepad"', "Process: kill process"),
+    ("set variable PATH to C:\\bin", "set PATH=C:\\bin", "Environment: set variable"),
+    ("show variable PATH", "echo %PATH%", "Environment: show variable"),
+    ("ping google.com", "ping google.com", "Network: ping"),
+    ("trace route to google.com", "tracert google.com", "Network: trace route"),
+    ("read file readme.txt", "type readme.txt", "Text: show file"),
+    ("edit file config.txt", "notepad config.txt", "Text: edit file"),
+    ("show file attributes readme.txt", "attrib readme.txt", "Properties: show attributes"),
+    ("hide file secret.txt", "attrib +h secret.txt", "Properties: hide file"),
+    ("show hidden files", "dir /ah", "Properties: list hidden"),
+    ("ls", "dir", "Alias: ls"),
+    ("pwd", "cd", "Alias: pwd"),
+    ("mkdir testdir", "mkdir testdir", "Alias: mkdir"),
+    ("rm file.txt", 'del "file.txt"', "Alias: rm"),
+)
+
+POWERSHELL_TEST_CASES: Tuple[Tuple[str, str, str], ...] = (
+    # (input, expected_command_part, description)
+    ("go to downloads", "Set-Location", "Navigation: go to directory"),
+    ("go back", "Set-Location ..", "Navigation: go back"),
+    ("show current directory", "Get-Location", "Navigation: show current directory"),
+    ("where am i", "Get-Location", "Navigation: where am i"),
+    ("list files", "Get-ChildItem", "Files: list files"),
+    ("list files sorted by size", "Sort-Object Length", "Files: list by size"),
+    ("list files sorted by name", "Sort-Object Name", "Files: list by name"),
+    ("create folder my-project", "New-Item -ItemType Directory", "Files: create folder"),
+    ("create directory test", "New-Item -ItemType Directory", "Files: create directory"),
+    ("delete file readme.txt", "Remove-Item", "Files: delete file"),
+    ("delete folder old-stuff", "Remove-Item", "Files: delete folder"),
+    ("open notepad", "Start-Process", "System: open program"),
+    ("clear", "Clear-Host", "System: clear screen"),
+    ("show disk space", "Get-PSDrive", "System: disk space"),
+    ("show ip address", "Get-NetIPAddress", "System: IP address"),
+    ("show my ip", "Get-NetIPAddress", "System: my IP"),
+    ("show date", "Get-Date", "System: show date"),
+    ("show time", "Get-Date", "System: show time"),
+    ("find files containing config", "Get-ChildItem -Recurse", "Search: find files"),
+    ("find text error in files", "Select-String", "Search: find text"),
+    ("copy file1.txt to backup", "Copy-Item", "Files: copy"),
+    ("move file.txt to archive", "Move-Item", "Files: move"),
+    ("show running processes", "Get-Process", "Process: list processes"),
+    ("kill process notepad", "Stop-Process", "Process: kill process"),
+    ("set variable PATH to C:\\bin", "$env:PATH", "Environment: set variable"),
+    ("show variable PATH", "$env:PATH", "Environment: show variable"),
+    ("ping google.com", "Test-Connection", "Network: ping"),
+    ("trace route to google.com", "Test-NetConnection", "Network: trace route"),
+    ("read file readme.txt", "Get-Content", "Text: show file"),
+    ("edit file config.txt", "notepad.exe", "Text: edit file"),
+    ("show file attributes readme.txt", "Get-ItemProperty", "Properties: show attributes"),
+    ("hide file secret.txt", "[System.IO.FileAttributes]::Hidden", "Properties: hide file"),
+    ("show hidden files", "Get-ChildItem -Hidden", "Properties: list hidden"),
+    ("ls", "Get-ChildItem", "Alias: ls"),
+    ("pwd", "Get-Location", "Alias: pwd"),
+    ("mkdir testdir", "New-Item -ItemType Directory", "Alias: mkdir"),
+    ("rm file.txt", "Remove-Item", "Alias: rm"),
+)
+
 
 def test_cmd_parser():
     """Run test cases for CMD commands"""
     parser = CMDNLPParser(dry_run=True, shell=ShellType.CMD)
 
-    test_cases = [
-        # (input, expected_command_start, description)
-        ("go to downloads", "cd Downloads", "Navigation: go to directory"),
-        ("go back", "cd ..", "Navigation: go back"),
-        ("show current directory", "cd", "Navigation: show current directory"),
-        ("where am i", "cd", "Navigation: where am i"),
-        ("list files", "dir", "Files: list files"),
-        ("list files sorted by size", "dir /O-S", "Files: list by size"),
-        ("list files sorted by name", "dir /O-N", "Files: list by name"),
-        ("create folder my-project", "mkdir my-project", "Files: create folder"),
-        ("create directory test", "mkdir test", "Files: create directory"),
-        ("delete file readme.txt", 'del "readme.txt"', "Files: delete file"),
-        ("delete folder old-stuff", 'rmdir /s /q "old-stuff"', "Files: delete folder"),
-        ("open notepad", "start notepad", "System: open program"),
-        ("clear", "cls", "System: clear screen"),
-        ("show disk space", "wmic logicaldisk", "System: disk space"),
-        ("show ip address", "ipconfig", "System: IP address"),
-        ("show my ip", "ipconfig", "System: my IP"),
-        ("show date", "date /t", "System: show date"),
-        ("show time", "time /t", "System: show time"),
-        ("find files containing config", "dir /s /b | findstr", "Search: find files"),
-        ("find text error in files", "findstr /s /i", "Search: find text"),
-        ("copy file1.txt to backup", 'copy "file1.txt" "backup"', "Files: copy"),
-        ("move file.txt to archive", 'move "file.txt" "archive"', "Files: move"),
-        ("show running processes", "tasklist", "Process: list processes"),
-        ("kill process notepad", 'taskkill /F /IM "notepad"', "Process: kill process"),
-        ("set variable PATH to C:\\bin", "set PATH=C:\\bin", "Environment: set variable"),
-        ("show variable PATH", "echo %PATH%", "Environment: show variable"),
-        ("ping google.com", "ping google.com", "Network: ping"),
-        ("trace route to google.com", "tracert google.com", "Network: trace route"),
-        ("read file readme.txt", "type readme.txt", "Text: show file"),
-        ("edit file config.txt", "notepad config.txt", "Text: edit file"),
-        ("show file attributes readme.txt", "attrib readme.txt", "Properties: show attributes"),
-        ("hide file secret.txt", "attrib +h secret.txt", "Properties: hide file"),
-        ("show hidden files", "dir /ah", "Properties: list hidden"),
-        ("ls", "dir", "Alias: ls"),
-        ("pwd", "cd", "Alias: pwd"),
-        ("mkdir testdir", "mkdir testdir", "Alias: mkdir"),
-        ("rm file.txt", 'del "file.txt"', "Alias: rm"),
-    ]
-
     print("🧪 Running CMD Tests")
     print("=" * 60)
 
     passed = 0
     failed = 0
+    lines = []  # Written in one go after the loop rather than a print per line
 
-    for input_text, expected_start, description in test_cases:
+    for input_text, expected_start, description in CMD_TEST_CASES:
         command, pattern = parser.parse(input_text)
 
         if command and expected_start in command:
-            print(f"✅ {description}")
-            print(f"   Input: '{input_text}'")
-            print(f"   CMD: {command}")
+            lines.append(f"✅ {description}")
+            lines.append(f"   Input: '{input_text}'")
+            lines.append(f"   CMD: {command}")
             passed += 1
         else:
-            print(f"❌ {description}")
-            print(f"   Input: '{input_text}'")
-            print(f"   Expected: {expected_start}")
-            print(f"   Got: {command}")
+            lines.append(f"❌ {description}")
+            lines.append(f"   Input: '{input_text}'")
+            lines.append(f"   Expected: {expected_start}")
+            lines.append(f"   Got: {command}")
             failed += 1
-        print()
+        lines.append("")
 
+    sys.stdout.write("\n".join(lines) + "\n")
     print("=" * 60)
     print(f"📊 CMD Results: {passed} passed, {failed} failed")
 
@@ -94,69 +142,30 @@ def test_powershell_parser():
     """Run test cases for PowerShell commands"""
     parser = CMDNLPParser(dry_run=True, shell=ShellType.POWERSHELL)
 
-    test_cases = [
-        # (input, expected_command_part, description)
-        ("go to downloads", "Set-Location", "Navigation: go to directory"),
-        ("go back", "Set-Location ..", "Navigation: go back"),
-        ("show current directory", "Get-Location", "Navigation: show current directory"),
-        ("where am i", "Get-Location", "Navigation: where am i"),
-        ("list files", "Get-ChildItem", "Files: list files"),
-        ("list files sorted by size", "Sort-Object Length", "Files: list by size"),
-        ("list files sorted by name", "Sort-Object Name", "Files: list by name"),
-        ("create folder my-project", "New-Item -ItemType Directory", "Files: create folder"),
-        ("create directory test", "New-Item -ItemType Directory", "Files: create directory"),
-        ("delete file readme.txt", "Remove-Item", "Files: delete file"),
-        ("delete folder old-stuff", "Remove-Item", "Files: delete folder"),
-        ("open notepad", "Start-Process", "System: open program"),
-        ("clear", "Clear-Host", "System: clear screen"),
-        ("show disk space", "Get-PSDrive", "System: disk space"),
-        ("show ip address", "Get-NetIPAddress", "System: IP address"),
-        ("show my ip", "Get-NetIPAddress", "System: my IP"),
-        ("show date", "Get-Date", "System: show date"),
-        ("show time", "Get-Date", "System: show time"),
-        ("find files containing config", "Get-ChildItem -Recurse", "Search: find files"),
-        ("find text error in files", "Select-String", "Search: find text"),
-        ("copy file1.txt to backup", "Copy-Item", "Files: copy"),
-        ("move file.txt to archive", "Move-Item", "Files: move"),
-        ("show running processes", "Get-Process", "Process: list processes"),
-        ("kill process notepad", "Stop-Process", "Process: kill process"),
-        ("set variable PATH to C:\\bin", "$env:PATH", "Environment: set variable"),
-        ("show variable PATH", "$env:PATH", "Environment: show variable"),
-        ("ping google.com", "Test-Connection", "Network: ping"),
-        ("trace route to google.com", "Test-NetConnection", "Network: trace route"),
-        ("read file readme.txt", "Get-Content", "Text: show file"),
-        ("edit file config.txt", "notepad.exe", "Text: edit file"),
-        ("show file attributes readme.txt", "Get-ItemProperty", "Properties: show attributes"),
-        ("hide file secret.txt", "[System.IO.FileAttributes]::Hidden", "Properties: hide file"),
-        ("show hidden files", "Get-ChildItem -Hidden", "Properties: list hidden"),
-        ("ls", "Get-ChildItem", "Alias: ls"),
-        ("pwd", "Get-Location", "Alias: pwd"),
-        ("mkdir testdir", "New-Item -ItemType Directory", "Alias: mkdir"),
-        ("rm file.txt", "Remove-Item", "Alias: rm"),
-    ]
-
     print("\n🧪 Running PowerShell Tests")
     print("=" * 60)
 
     passed = 0
     failed = 0
+    lines = []
 
-    for input_text, expected_part, description in test_cases:
+    for input_text, expected_part, description in POWERSHELL_TEST_CASES:
         command, pattern = parser.parse(input_text)
 
         if command and expected_part in command:
-            print(f"✅ {description}")
-            print(f"   Input: '{input_text}'")
-            print(f"   PowerShell: {command}")
+            lines.append(f"✅ {description}")
+            lines.append(f"   Input: '{input_text}'")
+            lines.append(f"   PowerShell: {command}")
             passed += 1
         else:
-            print(f"❌ {description}")
-            print(f"   Input: '{input_text}'")
-            print(f"   Expected part: {expected_part}")
-            print(f"   Got: {command}")
+            lines.append(f"❌ {description}")
+            lines.append(f"   Input: '{input_text}'")
+            lines.append(f"   Expected part: {expected_part}")
+            lines.append(f"   Got: {command}")
             failed += 1
-        print()
+        lines.append("")
 
+    sys.stdout.write("\n".join(lines) + "\n")
     print("=" * 60)
     print(f"📊 PowerShell Results: {passed} passed, {failed} failed")
 
@@ -204,6 +213,37 @@ def test_dual_shell_output():
     return 0 if all_passed else 1
 
 
+def test_parse_many():
+    """Test that batch parsing returns the expected command for each input, in order"""
+    parser = CMDNLPParser(dry_run=True, shell=ShellType.CMD)
+
+    print("\n🧪 Testing Batch Parsing")
+    print("=" * 60)
+
+    test_cases = [
+        # (input, expected_command)
+        ("go to downloads", "cd downloads"),
+        ("list files sorted by size", "dir /O-S"),
+        ("xyz123", None),
+        ("ls", "dir"),
+        ("kill process notepad", 'taskkill /F /IM "notepad"'),
+    ]
+
+    results = parser.parse_many(input_text for input_text, _ in test_cases)
+    all_passed = len(results) == len(test_cases)
+    for (input_text, expected), (command, pattern) in zip(test_cases, results):
+        if command == expected:
+            print(f"✅ '{input_text}' -> {command}")
+        else:
+            print(f"❌ '{input_text}' - Expected {expected}, got {command}")
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("🎉 All batch parsing tests passed!")
+    return 0 if all_passed else 1
+
+
 def test_edge_cases():
     """Test edge cases"""
     parser = CMDNLPParser(dry_run=True, shell=ShellType.CMD)
@@ -216,16 +256,315 @@ def test_edge_cases():
         ("go to", "Incomplete command"),
         ("xyz123", "Unrecognized command"),
         ("delete file", "Missing filename"),
+        ("clearance", "Word that only starts like a command"),
+        ("list files please", "Trailing text after a command"),
     ]
 
+    failed = 0
     for input_text, description in edge_cases:
         command, pattern = parser.parse(input_text)
         if command is None:
             print(f"✅ {description}: Correctly returned None")
         else:
-            print(f"⚠️  {description}: Unexpected command '{command}'")
+            print(f"❌ {description}: Unexpected command '{command}'")
+            failed += 1
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All edge case tests passed!")
+    return 1 if failed else 0
+
+
+def test_stats_snapshot():
+    """Test that show_stats tallies resume from their snapshot and rescan when stale"""
+    print("\n🧪 Testing Stats Snapshot")
+    print("=" * 60)
+
+    entries = [
+        {"shell": "cmd", "category": "files", "pattern_description": "List files",
+         "safe": True, "executed": True},
+        {"shell": "cmd", "category": None, "pattern_description": 5,
+         "safe": False, "executed": False},
+    ]
+
+    def append(path, items):
+        with open(path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+
+    failed = 0
+
+    def check(description, tallies, total, categories):
+        nonlocal failed
+        got = (tallies["total"], dict(tallies["categories"]))
+        if got == (total, categories):
+            print(f"✅ {description}")
+        else:
+            print(f"❌ {description} - Expected {(total, categories)}, got {got}")
+            failed += 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "history.jsonl")
+        parser = CMDNLPParser(log_file=log_file, dry_run=True, shell=ShellType.CMD)
+
+        append(log_file, entries)
+        check("First run with null and numeric keys", parser._tally_log(),
+              2, {"files": 1, "None": 1})
+        if not os.path.exists(log_file + ".stats.json"):
+            print("❌ First run - Snapshot was not saved")
+            failed += 1
+
+        append(log_file, entries)
+        check("Resumed run after append", parser._tally_log(),
+              4, {"files": 2, "None": 2})
+
+        with open(log_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps(entries[0]) + "\n")
+        check("Rescan after the log was truncated", parser._tally_log(),
+              1, {"files": 1})
+
+        # A complete last entry without a newline is counted, and counted once more
+        # only after its line is finished and another entry follows
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entries[0]))
+        check("Last entry without a newline", parser._tally_log(),
+              2, {"files": 2})
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("\n")
+        append(log_file, entries[:1])
+        check("Resumed run after the last line was finished", parser._tally_log(),
+              3, {"files": 3})
 
     print("=" * 60)
+    if failed == 0:
+        print("🎉 All stats snapshot tests passed!")
+    return 1 if failed else 0
+
+
+def _linear_parse(parser, text):
+    """Reference parse: try every pattern in order, as before combined dispatch existed"""
+    text = text.strip()
+    for pattern in parser.patterns:
+        match = pattern.match(text)
+        if match:
+            command = pattern.get_command(parser.shell_mode, match)
+            if command:
+                return command, pattern
+    return None, None
+
+
+def test_combined_dispatch():
+    """Test that bucketed combined-regex dispatch picks the same pattern as a linear scan"""
+    print("\n🧪 Testing Combined Dispatch")
+    print("=" * 60)
+
+    # Group references cannot be merged into one regex, so their buckets must fall back
+    # to the linear scan rather than quietly stop matching. Each is loaded on its own,
+    # so one fallback does not hide another
+    custom_cases = [
+        ({"pattern": r"(\w+) again \1", "command": "echo {1} twice"},
+         [("hello again hello", "echo hello twice"), ("hello again world", None)]),
+        ({"pattern": r"(<)?tag(?(1)>)", "command": "echo tag"},
+         [("<tag>", "echo tag"), ("tag", "echo tag"), ("<tag", None)]),
+        ({"pattern": r"(?P<word>\w+) twice (?P=word)", "command": "echo {1}"},
+         [("hi twice hi", "echo hi"), ("hi twice ho", None)]),
+        ({"pattern": r"list everything", "command": "dir /s"},
+         [("list everything", "dir /s")]),
+    ]
+    inputs = [case[0] for case in CMD_TEST_CASES] + [
+        "", "xyz123", "clearance", "list files please", "  LIST FILES  ", "Go To Downloads",
+        "go to " + "a" * 1200,
+    ]
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = os.path.join(tmp, "config.json")
+        for custom_pattern, expected in custom_cases:
+            with open(config_file, "w", encoding="utf-8") as f:
+                json.dump({"patterns": [custom_pattern]}, f)
+            parser = CMDNLPParser(dry_run=True, shell=ShellType.CMD, config_file=config_file,
+                                  log_file=os.path.join(tmp, "history.jsonl"))
+
+            for input_text, command in expected:
+                got, _ = parser.parse(input_text)
+                if got == command:
+                    print(f"✅ '{input_text}' -> {got}")
+                else:
+                    print(f"❌ '{input_text}' - Expected {command}, got {got}")
+                    failed += 1
+
+            texts = inputs + [case[0] for case in expected]
+            mismatches = [text for text in texts if parser.parse(text) != _linear_parse(parser, text)]
+            if mismatches:
+                print(f"❌ Dispatch differs from a linear scan for: {mismatches}")
+                failed += 1
+            else:
+                print(f"✅ Dispatch matches a linear scan with {custom_pattern['pattern']!r}")
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All combined dispatch tests passed!")
+    return 1 if failed else 0
+
+def test_custom_pattern_validation():
+    """Test that malformed custom pattern entries are skipped without breaking parsing"""
+    print("\n🧪 Testing Custom Pattern Validation")
+    print("=" * 60)
+
+    custom_patterns = [
+        "not an object",
+        {"pattern": 5, "command": "echo bad"},
+        {"pattern": "bad template", "command": ["echo", "bad"]},
+        {"pattern": "bad category", "command": "echo bad", "category": ["x"]},
+        {"pattern": "bad description", "command": "echo bad", "description": {"a": 1}},
+        {"pattern": "bad (regex", "command": "echo bad"},
+        {"pattern": "good one", "command": "echo good", "category": "custom"},
+    ]
+    expected = [
+        ("list files", "dir"),
+        ("good one", "echo good"),
+        ("bad category", None),
+        ("bad description", None),
+    ]
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = os.path.join(tmp, "config.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump({"patterns": custom_patterns}, f)
+        # no_emoji also silences the per-entry load warnings
+        parser = CMDNLPParser(dry_run=True, no_emoji=True, shell=ShellType.CMD,
+                              config_file=config_file, log_file=os.path.join(tmp, "history.jsonl"))
+
+        for input_text, command in expected:
+            got, _ = parser.parse(input_text)
+            if got == command:
+                print(f"✅ '{input_text}' -> {got}")
+            else:
+                print(f"❌ '{input_text}' - Expected {command}, got {got}")
+                failed += 1
+        if len(parser.custom_patterns) != 1:
+            print(f"❌ Expected 1 custom pattern loaded, got {len(parser.custom_patterns)}")
+            failed += 1
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All custom pattern validation tests passed!")
+    return 1 if failed else 0
+
+
+def test_surrogate_logging():
+    """Test that input with a lone surrogate (an undecodable argv byte) is logged and read back"""
+    print("\n🧪 Testing Surrogate Logging")
+    print("=" * 60)
+
+    input_text = "go to caf\udce9"  # How Python decodes b"caf\xe9" from argv on UTF-8
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "history.jsonl")
+        with CMDNLPParser(log_file=log_file, dry_run=True, shell=ShellType.CMD) as parser:
+            command, pattern = parser.parse(input_text)
+            try:
+                parser.log_command(input_text, command, pattern, executed=False)
+            except (TypeError, ValueError) as e:
+                print(f"❌ Logging failed: {e!r}")
+                failed += 1
+        tallies = parser._tally_log()
+        if tallies["total"] == 1:
+            print("✅ Entry logged and counted")
+        else:
+            print(f"❌ Expected 1 logged entry, got {tallies['total']}")
+            failed += 1
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All surrogate logging tests passed!")
+    return 1 if failed else 0
+
+
+def test_log_dir_after_chdir():
+    """Test that a relative log directory is created again after the working directory changes"""
+    print("\n🧪 Testing Log Directory After chdir")
+    print("=" * 60)
+
+    failed = 0
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for name in ("first", "second"):
+                os.makedirs(os.path.join(tmp, name))
+                os.chdir(os.path.join(tmp, name))
+                CMDNLPParser(dry_run=True, shell=ShellType.CMD)  # Default logs/... path
+                if os.path.isdir("logs"):
+                    print(f"✅ Log directory created in {name}/")
+                else:
+                    print(f"❌ Log directory missing in {name}/")
+                    failed += 1
+        finally:
+            os.chdir(cwd)
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All log directory tests passed!")
+    return 1 if failed else 0
+
+
+def test_regex_source_helpers():
+    """Test the regex-source parsing behind first-word bucketing and the exact-match table"""
+    print("\n🧪 Testing Regex Source Helpers")
+    print("=" * 60)
+
+    test_cases = [
+        # (function, argument, expected)
+        (_split_alternatives, "ls|dir", ["ls", "dir"]),
+        (_split_alternatives, "a(b|c)|d", ["a(b|c)", "d"]),
+        (_split_alternatives, "[|]x|y", ["[|]x", "y"]),
+        (_split_alternatives, "a\\|b|c", ["a\\|b", "c"]),
+        (_first_tokens, "go to (.+)", frozenset({"go"})),
+        (_first_tokens, "ls|dir", frozenset({"ls", "dir"})),
+        (_first_tokens, "^pwd", frozenset({"pwd"})),
+        (_first_tokens, "Clear", frozenset({"clear"})),
+        (_first_tokens, "show (?:running )?processes", frozenset({"show"})),
+        (_first_tokens, "lists? files", None),  # "list" alone would also match
+        (_first_tokens, "go ?to", None),
+        (_first_tokens, "(.+) again", None),
+        (_first_tokens, "go|(.+)", None),
+        (_first_tokens, "(?:edit|open) file (.+)", frozenset({"edit", "open"})),
+        (_first_tokens, "(?:go|cd) to|pwd", frozenset({"go", "cd", "pwd"})),
+        (_first_tokens, "(?:show|list) (?:running )?processes", frozenset({"show", "list"})),
+        (_first_tokens, "(?:a|b)? x", None),  # The verb group itself is optional
+        (_first_tokens, "(?:(.+)|x) y", None),
+        (_group_end, "(a(b)c)d", 6),
+        (_group_end, "(a[)]b)c", 6),
+        (_group_end, "(a\\)b)c", 5),
+        (_group_end, "(ab", None),
+        (_expand_optional_literals, "list files", ["list files"]),
+        (_expand_optional_literals, "show (?:running )?processes",
+         ["show processes", "show running processes"]),
+        (_expand_optional_literals, "list(?: all)? files(?: now)?",
+         ["list files", "list files now", "list all files", "list all files now"]),
+        # More optional groups than _MAX_OPTIONAL_LITERALS stay a regex
+        (_expand_optional_literals, "a(?:b)?(?:c)?(?:d)?(?:e)?(?:f)?",
+         ["a(?:b)?(?:c)?(?:d)?(?:e)?(?:f)?"]),
+        (_literal_alternatives, "show (?:running )?processes|ps",
+         ["show processes", "show running processes", "ps"]),
+        (_literal_alternatives, "^Clear$", ["clear"]),
+        (_literal_alternatives, "list (.+)", None),
+    ]
+
+    failed = 0
+    for function, argument, expected in test_cases:
+        got = function(argument)
+        if got == expected:
+            print(f"✅ {function.__name__}({argument!r})")
+        else:
+            print(f"❌ {function.__name__}({argument!r}) - Expected {expected}, got {got}")
+            failed += 1
+
+    print("=" * 60)
+    if failed == 0:
+        print("🎉 All regex source helper tests passed!")
+    return 1 if failed else 0
 
 
 def test_shell_detection():
@@ -252,8 +591,16 @@ if __name__ == "__main__":
     result1 = test_cmd_parser()
     result2 = test_powershell_parser()
     result3 = test_dual_shell_output()
-    test_edge_cases()
-    result4 = test_shell_detection()
+    result4 = test_parse_many()
+    result5 = test_edge_cases()
+    result6 = test_shell_detection()
+    result7 = test_stats_snapshot()
+    result8 = test_combined_dispatch()
+    result9 = test_custom_pattern_validation()
+    result10 = test_surrogate_logging()
+    result11 = test_log_dir_after_chdir()
+    result12 = test_regex_source_helpers()
     
-    total_failed = result1 + result2 + result3 + result4
+    total_failed = (result1 + result2 + result3 + result4 + result5 + result6 + result7
+                    + result8 + result9 + result10 + result11 + result12)
     sys.exit(total_failed)